@@ -1,15 +1,17 @@
 import io
 import os
+import queue
 import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from functools import partial
+from typing import List, Optional, Tuple
 
 import streamlit as st
 
+from src.call_utils import translate_file
 from src.openai_translate import OpenAITranslator
 from src.text_utils import parse_glossary_lines
-from src.pdf_translate import translate_pdf_bytes
-from src.pptx_translate import translate_pptx_bytes
-from src.xlsm_translate import translate_excel_to_xls_bytes  # MUST exist
 
 
 st.set_page_config(page_title="CKST Translator", layout="wide")
@@ -58,6 +60,11 @@ with st.sidebar:
         index=2,
     )
 
+    use_batch_api = st.checkbox(
+        "Use Batch API for Excel (50% cheaper, can take much longer)",
+        value=False,
+    )
+
 if not api_key:
     st.warning(
         "OpenAI key is not configured.\n\n"
@@ -118,7 +125,11 @@ uploaded_files = st.file_uploader(
 run = st.button("Translate to English", type="primary", disabled=not (uploaded_files and api_key))
 
 
-def build_translator():
+@st.cache_resource(show_spinner=False)
+def build_translator(api_key: str, model: str, reasoning_effort: str):
+    # One translator (one OpenAI client, one keep-alive connection pool) per
+    # key/model/effort, reused across reruns and files: later requests skip the
+    # TCP/TLS handshake
     # Tolerant to different OpenAITranslator signatures
     try:
         return OpenAITranslator(api_key=api_key, model=model, reasoning_effort=reasoning_effort)
@@ -131,123 +142,112 @@ def build_translator():
     return OpenAITranslator(api_key, model)
 
 
-def call_translate(func, data: bytes, translator, on_progress):
-    attempts = [
-        lambda: func(
-            data,
-            translator,
-            source_lang="pt-BR",
-            target_lang="en",
-            glossary=glossary,
-            extra_instructions=extra_instructions,
-            on_progress=on_progress,
-        ),
-        lambda: func(
-            data,
-            translator,
-            glossary=glossary,
-            extra_instructions=extra_instructions,
-            on_progress=on_progress,
-        ),
-        lambda: func(data, translator, on_progress=on_progress),
-        lambda: func(data, translator),
-        lambda: func(data),
-    ]
-    last_err = None
-    for a in attempts:
-        try:
-            return a()
-        except TypeError as e:
-            last_err = e
-    raise last_err
+# Files translated at the same time, and translation requests each of them keeps
+# in flight. The translator's rate limiter is off unless CKST_OPENAI_RPM/TPM are
+# set, so these two bound the total: 2 x 4 = the 8 a single file used before.
+# excel_convert.MAX_PARALLEL_CONVERSIONS keeps one LibreOffice profile per file
+MAX_PARALLEL_FILES = 2
+WORKERS_PER_FILE = 4
 
 
 if run:
-    translator = build_translator()
+    translator = build_translator(api_key, model, reasoning_effort)
 
-    results = []
     overall = st.progress(0.0, text="Starting...")
     status = st.empty()
 
     total_files = len(uploaded_files)
-
-    for idx, uf in enumerate(uploaded_files, start=1):
-        filename = uf.name
-        ext = filename.split(".")[-1].lower()
-        data = uf.read()
-
-        status.info(f"Processing **{filename}** ({idx}/{total_files})")
-
-        main_bar = st.progress(0.0, text="starting…")
-        batch_bar = st.progress(0.0, text="")  # used for Excel batches
-
-        def on_progress_generic(label: str, done: int, total: int):
-            total = max(1, int(total))
-            done = max(0, int(done))
-            pct = min(1.0, done / total)
-            main_bar.progress(pct, text=f"{label} ({done}/{total})")
-
-        def on_progress_excel(label: str, done: int, total: int):
-            total = max(1, int(total))
-            done = max(0, int(done))
-            pct = min(1.0, done / total)
-
-            if label in ("pages", "sheets", "tabs"):
-                main_bar.progress(pct, text=f"pages ({done}/{total})")
-            elif label in ("batches",):
-                batch_bar.progress(pct, text=f"batches ({done}/{total})")
-            else:
-                main_bar.progress(pct, text=f"{label} ({done}/{total})")
-
-        try:
-            if ext == "pdf":
-                out_bytes = call_translate(translate_pdf_bytes, data, translator, on_progress_generic)
-                out_name = filename[:-4] + "_EN.pdf"
-                mime = "application/pdf"
-
-            elif ext == "pptx":
-                out_bytes = call_translate(translate_pptx_bytes, data, translator, on_progress_generic)
-                out_name = filename[:-5] + "_EN.pptx"
-                mime = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-
-            elif ext in ("xlsm", "xls"):
-                out_bytes = translate_excel_to_xls_bytes(
-                    excel_bytes=data,
-                    input_ext=ext,
-                    translator=translator,
-                    source_lang="pt-BR",
-                    target_lang="en",
-                    glossary=glossary,
-                    extra_instructions=extra_instructions,
-                    on_progress=on_progress_excel,
-                    batch_size=25,
-                )
-                out_name = filename.rsplit(".", 1)[0] + "_EN.xls"
-                mime = "application/vnd.ms-excel"
-                batch_bar.empty()
-
-            else:
-                raise ValueError(f"Unsupported file type: {ext}")
-
-            results.append((out_name, out_bytes, mime))
-            st.success(f"✅ Done: {out_name}")
-            st.download_button(
-                label=f"Download {out_name}",
-                data=out_bytes,
-                file_name=out_name,
-                mime=mime,
-            )
-
-        except Exception as e:
-            st.error(f"❌ Error translating {filename}: {e}")
-
-        overall.progress(idx / total_files, text=f"Processed {idx}/{total_files} file(s)")
+    jobs = [(uf.name, uf.read()) for uf in uploaded_files]
+
+    status.info(f"Processing **{total_files}** file(s)")
+
+    # One main bar per file, plus a second one used for Excel batches
+    bars = [(st.progress(0.0, text=f"{name}: waiting…"), st.progress(0.0, text="")) for name, _ in jobs]
+
+    # Streamlit widgets may only be updated from this thread: workers post
+    # (file index, label, done, total) here and the loop below draws them
+    events: "queue.Queue[tuple]" = queue.Queue()
+
+    def post_progress(i: int, label: str, done: int, total: int):
+        events.put((i, label, done, total))
+
+    def show_progress(i: int, label: str, done: int, total: int):
+        total = max(1, int(total))
+        done = max(0, int(done))
+        pct = min(1.0, done / total)
+        main_bar, batch_bar = bars[i]
+
+        if label in ("pages", "sheets", "tabs"):
+            main_bar.progress(pct, text=f"{jobs[i][0]}: pages ({done}/{total})")
+        elif label in ("batches",):
+            batch_bar.progress(pct, text=f"batches ({done}/{total})")
+        else:
+            main_bar.progress(pct, text=f"{jobs[i][0]}: {label} ({done}/{total})")
+
+    def drain_progress():
+        while True:
+            try:
+                show_progress(*events.get_nowait())
+            except queue.Empty:
+                break
+
+    outputs: List[Optional[Tuple[str, bytes, str]]] = [None] * total_files
+    finished = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_FILES, total_files))) as ex:
+        futures = {
+            ex.submit(
+                translate_file,
+                name,
+                data,
+                translator,
+                partial(post_progress, i),
+                glossary,
+                extra_instructions,
+                max_workers=WORKERS_PER_FILE,
+                use_batch_api=use_batch_api or None,  # unchecked: CKST_USE_BATCH_API decides
+            ): i
+            for i, (name, data) in enumerate(jobs)
+        }
+        pending = set(futures)
+        while pending:
+            done_futures, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            drain_progress()
+
+            for fut in done_futures:
+                i = futures[fut]
+                finished += 1
+                bars[i][1].empty()
+                try:
+                    out_name, out_bytes, mime = fut.result()
+                except Exception as e:
+                    st.error(f"❌ Error translating {jobs[i][0]}: {e}")
+                else:
+                    outputs[i] = (out_name, out_bytes, mime)
+                    st.success(f"✅ Done: {out_name}")
+                    st.download_button(
+                        label=f"Download {out_name}",
+                        data=out_bytes,
+                        file_name=out_name,
+                        mime=mime,
+                    )
+
+                overall.progress(finished / total_files, text=f"Processed {finished}/{total_files} file(s)")
+
+        # Anything posted after the last wait() returned
+        drain_progress()
+
+    # ZIP in upload order, whatever order the files finished in
+    results = [r for r in outputs if r is not None]
 
     if results:
         zbuf = io.BytesIO()
         with zipfile.ZipFile(zbuf, "w", zipfile.ZIP_DEFLATED) as zf:
             for out_name, out_bytes, _ in results:
-                zf.writestr(out_name, out_bytes)
+                # PPTX is already a zip and PDF streams are already deflated:
+                # store those as-is; legacy .xls (BIFF) still compresses well
+                compress = zipfile.ZIP_DEFLATED if out_name.lower().endswith(".xls") else zipfile.ZIP_STORED
+                zf.writestr(out_name, out_bytes, compress_type=compress)
 
         zip_name = f"translations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
         st.download_button(
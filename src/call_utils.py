@@ -0,0 +1,136 @@
+import inspect
+from typing import Callable, Dict, Optional, Tuple
+
+from .pdf_translate import translate_pdf_bytes
+from .pptx_translate import translate_pptx_bytes
+from .xlsm_translate import translate_excel_to_xls_bytes  # MUST exist
+
+# (func, max_workers given) -> index of the call form its signature accepts
+# (decided once per function and form set, per process: lives here rather than in
+# the Streamlit script so reruns keep it)
+_CALL_FORM_CACHE: Dict[Tuple[Callable, bool], int] = {}
+
+
+def call_translate(
+    func: Callable,
+    data: bytes,
+    translator,
+    glossary: Dict[str, str],
+    extra_instructions: str,
+    on_progress: Optional[Callable] = None,
+    source_lang: str = "pt-BR",
+    target_lang: str = "en",
+    max_workers: Optional[int] = None,
+):
+    """
+    Call func with the richest argument set its signature accepts. The form is
+    picked by binding against inspect.signature, not by trial calls: a TypeError
+    raised from inside a translation can no longer trigger a second (paid) run.
+    """
+    full = dict(
+        source_lang=source_lang,
+        target_lang=target_lang,
+        glossary=glossary,
+        extra_instructions=extra_instructions,
+    )
+    forms = []
+    if max_workers is not None:
+        # Same full forms with max_workers first; funcs without it fall through
+        forms += [
+            ((data, translator), dict(full, max_workers=max_workers, on_progress=on_progress)),
+            ((data, translator), dict(full, max_workers=max_workers, progress_callback=on_progress)),
+        ]
+    forms += [
+        ((data, translator), dict(full, on_progress=on_progress)),
+        ((data, translator), dict(full, progress_callback=on_progress)),
+        ((data, translator), dict(glossary=glossary, extra_instructions=extra_instructions, on_progress=on_progress)),
+        ((data, translator), dict(on_progress=on_progress)),
+        ((data, translator), {}),
+        ((data,), {}),
+    ]
+
+    # The form list depends on whether max_workers is given: an index picked
+    # without it says nothing about whether func accepts it
+    key = (func, max_workers is not None)
+    idx = _CALL_FORM_CACHE.get(key)
+    if idx is None:
+        sig = inspect.signature(func)
+        for i, (args, kwargs) in enumerate(forms):
+            try:
+                sig.bind(*args, **kwargs)
+            except TypeError:
+                continue
+            idx = _CALL_FORM_CACHE[key] = i
+            break
+        else:
+            raise TypeError(f"{getattr(func, '__name__', func)}: no supported call signature")
+
+    args, kwargs = forms[idx]
+    return func(*args, **kwargs)
+
+
+def translate_file(
+    filename: str,
+    data: bytes,
+    translator,
+    on_progress: Callable[[str, int, int], None],
+    glossary: Dict[str, str],
+    extra_instructions: str,
+    max_workers: int = 8,
+    use_batch_api: Optional[bool] = None,
+) -> Tuple[str, bytes, str]:
+    """
+    Translate one uploaded file; returns (out_name, out_bytes, mime).
+    on_progress(label, done, total) may be called from a worker thread.
+    """
+    ext = filename.split(".")[-1].lower()
+
+    if ext == "pdf":
+        # The PDF path reports (label, fraction): map it onto (label, done, total)
+        def pdf_progress(label: str, frac: Optional[float] = None) -> None:
+            on_progress(label, int((frac or 0) * 100), 100)
+
+        out_bytes = call_translate(
+            translate_pdf_bytes,
+            data,
+            translator,
+            glossary,
+            extra_instructions,
+            pdf_progress,
+            max_workers=max_workers,
+        )
+        return filename[:-4] + "_EN.pdf", out_bytes, "application/pdf"
+
+    if ext == "pptx":
+        out_bytes = call_translate(
+            translate_pptx_bytes,
+            data,
+            translator,
+            glossary,
+            extra_instructions,
+            on_progress,
+            max_workers=max_workers,
+        )
+        return (
+            filename[:-5] + "_EN.pptx",
+            out_bytes,
+            "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        )
+
+    if ext in ("xlsm", "xls"):
+        out_bytes = translate_excel_to_xls_bytes(
+            excel_bytes=data,
+            input_ext=ext,
+            translator=translator,
+            source_lang="pt-BR",
+            target_lang="en",
+            glossary=glossary,
+            extra_instructions=extra_instructions,
+            on_progress=on_progress,
+            batch_size=100,
+            max_workers=max_workers,
+            use_batch_api=use_batch_api,
+        )
+        return filename.rsplit(".", 1)[0] + "_EN.xls", out_bytes, "application/vnd.ms-excel"
+
+    raise ValueError(f"Unsupported file type: {ext}")
@@ -1,7 +1,20 @@
+import os
+import queue
 import shutil
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import List
+
+# Conversions that may run at once (the app translates MAX_PARALLEL_FILES files
+# in parallel). Each gets a LibreOffice profile of its own: soffice runs sharing
+# one lock each other out and exit without writing the output. Building a fresh
+# profile costs seconds, so the profiles are created on first use and reused.
+MAX_PARALLEL_CONVERSIONS = 2
+_PROFILE_ROOT = Path(tempfile.gettempdir()) / f"ckst-soffice-profiles-{os.getpid()}"
+_profile_slots: "queue.Queue[Path]" = queue.Queue()
+for _slot in range(MAX_PARALLEL_CONVERSIONS):
+    _profile_slots.put(_PROFILE_ROOT / str(_slot))
 
 
 def soffice_available() -> bool:
@@ -15,50 +28,72 @@ def convert_office_bytes(input_bytes: bytes, input_ext: str, output_ext: str) ->
     input_ext/output_ext examples: "xls", "xlsx", "xlsm"
     Returns converted file bytes.
     """
+    input_ext = input_ext.lower().lstrip(".")
+
+    with tempfile.TemporaryDirectory() as td:
+        in_path = Path(td) / f"input.{input_ext}"
+        in_path.write_bytes(input_bytes)
+        return convert_office_file(in_path, output_ext)
+
+
+def convert_office_file(in_path: Path, output_ext: str) -> bytes:
+    """
+    Convert an Office file already on disk (e.g. saved there directly by openpyxl).
+    The output is written next to it, so in_path should live in its own temp dir.
+    Returns converted file bytes.
+    """
     if not soffice_available():
         raise RuntimeError(
             "LibreOffice (soffice) is not available. Install LibreOffice and ensure 'soffice' is in PATH. "
             "On Streamlit Cloud add packages.txt with 'libreoffice'."
         )
 
-    input_ext = input_ext.lower().lstrip(".")
     output_ext = output_ext.lower().lstrip(".")
+    in_path = Path(in_path)
+    td_path = in_path.parent
 
-    with tempfile.TemporaryDirectory() as td:
-        td_path = Path(td)
-        in_path = td_path / f"input.{input_ext}"
-        in_path.write_bytes(input_bytes)
+    # Filters (xls needs a better hint sometimes)
+    convert_to_candidates = []
+    if output_ext == "xls":
+        convert_to_candidates = ["xls", 'xls:"MS Excel 97"']
+    else:
+        convert_to_candidates = [output_ext]
+
+    # Blocks while every profile is in use by another conversion
+    profile_dir = _profile_slots.get()
+    try:
+        return _convert_with_profile(in_path, td_path, output_ext, convert_to_candidates, profile_dir)
+    finally:
+        _profile_slots.put(profile_dir)
+
+
+def _convert_with_profile(
+    in_path: Path, td_path: Path, output_ext: str, convert_to_candidates: List[str], profile_dir: Path
+) -> bytes:
+    last_err = None
+    for conv in convert_to_candidates:
+        try:
+            cmd = [
+                "soffice",
+                f"-env:UserInstallation={profile_dir.as_uri()}",
+                "--headless",
+                "--nologo",
+                "--norestore",
+                "--nolockcheck",
+                "--nodefault",
+                "--convert-to",
+                conv,
+                "--outdir",
+                str(td_path),
+                str(in_path),
+            ]
+            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            outs = list(td_path.glob(f"*.{output_ext}"))
+            if not outs:
+                raise RuntimeError("Converted file not found after LibreOffice conversion.")
+            return outs[0].read_bytes()
+        except Exception as e:
+            last_err = e
 
-        # Filters (xls needs a better hint sometimes)
-        convert_to_candidates = []
-        if output_ext == "xls":
-            convert_to_candidates = ["xls", 'xls:"MS Excel 97"']
-        else:
-            convert_to_candidates = [output_ext]
-
-        last_err = None
-        for conv in convert_to_candidates:
-            try:
-                cmd = [
-                    "soffice",
-                    "--headless",
-                    "--nologo",
-                    "--norestore",
-                    "--nolockcheck",
-                    "--nodefault",
-                    "--convert-to",
-                    conv,
-                    "--outdir",
-                    str(td_path),
-                    str(in_path),
-                ]
-                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-                outs = list(td_path.glob(f"*.{output_ext}"))
-                if not outs:
-                    raise RuntimeError("Converted file not found after LibreOffice conversion.")
-                return outs[0].read_bytes()
-            except Exception as e:
-                last_err = e
-
-        raise RuntimeError(f"LibreOffice conversion failed: {last_err}")
+    raise RuntimeError(f"LibreOffice conversion failed: {last_err}")
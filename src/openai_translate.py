@@ -1,10 +1,30 @@
 import json
+import os
 import re
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import openai
 from openai import OpenAI
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential, wait_random
 
-from .text_utils import apply_glossary_hard, protect_text, restore_protected
+from .text_utils import compile_glossary, protect_text, restore_protected
+
+
+# Transient API failures worth another attempt (429, timeouts, dropped connections, 5xx)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+# Bounded chunks so several requests can be in flight at once
+CHUNK_MAX_ITEMS = 60
+CHUNK_MAX_CHARS = 18000
 
 
 class TranslationItem:
@@ -15,31 +35,120 @@ class TranslationItem:
         self.text = text
 
 
-def chunk_items(
-    items: List[TranslationItem],
+def iter_chunks(
+    items: Iterable[TranslationItem],
     max_items: int = 800,
     max_chars: int = 90000,
-) -> List[List[TranslationItem]]:
+) -> Iterator[List[TranslationItem]]:
     """
-    Large chunks (to satisfy "remove batching limits" as much as realistically possible),
-    but still protects against API request limits.
+    Streaming chunk_items: yields each chunk as soon as it is full, so a lazy
+    producer of items can feed translate_chunks while it is still running.
     """
-    out: List[List[TranslationItem]] = []
     cur: List[TranslationItem] = []
     cur_chars = 0
 
     for it in items:
         t = it.text or ""
         if cur and (len(cur) >= max_items or (cur_chars + len(t)) > max_chars):
-            out.append(cur)
+            yield cur
             cur = []
             cur_chars = 0
         cur.append(it)
         cur_chars += len(t)
 
     if cur:
-        out.append(cur)
-    return out
+        yield cur
+
+
+def chunk_items(
+    items: List[TranslationItem],
+    max_items: int = 800,
+    max_chars: int = 90000,
+) -> List[List[TranslationItem]]:
+    """
+    Large chunks (to satisfy "remove batching limits" as much as realistically possible),
+    but still protects against API request limits.
+    """
+    return list(iter_chunks(items, max_items=max_items, max_chars=max_chars))
+
+
+def dedupe_items(
+    items: Iterable[TranslationItem],
+    first_id: Optional[Dict[str, str]] = None,
+) -> Tuple[List[TranslationItem], Dict[str, str]]:
+    """
+    Collapse items with identical text so each distinct string is translated once
+    (repeated headers, footers, labels).
+    Returns (unique_items, alias) where alias maps every item id -> id of the
+    unique item that carries the same text.
+    Pass the same first_id dict (text -> id) across calls to dedupe incrementally,
+    e.g. page by page: texts seen in an earlier call are not returned again.
+    """
+    unique: List[TranslationItem] = []
+    if first_id is None:
+        first_id = {}
+    alias: Dict[str, str] = {}
+
+    for it in items:
+        rep = first_id.get(it.text)
+        if rep is None:
+            rep = first_id[it.text] = it.id
+            unique.append(it)
+        alias[it.id] = rep
+
+    return unique, alias
+
+
+class RateLimiter:
+    """
+    Token bucket for requests/min and tokens/min, shared by all worker threads.
+    acquire() blocks until both buckets have room, so bursts are shaped below the
+    account limits up front instead of bouncing off 429s. None/0 = no limit.
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm or 0
+        self.tpm = tpm or 0
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        if not self.rpm and not self.tpm:
+            return
+        # a request larger than the whole bucket waits for a full bucket
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._last = now
+                if self.rpm:
+                    self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+                if self.tpm:
+                    self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = (1 - self._requests) * 60.0 / self.rpm
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60.0 / self.tpm)
+
+                if wait <= 0:
+                    if self.rpm:
+                        self._requests -= 1
+                    self._tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
+def _env_int(name: str) -> Optional[int]:
+    try:
+        return int(os.getenv(name, "").strip()) or None
+    except ValueError:
+        return None
 
 
 def _extract_json(text: str) -> Optional[Dict[str, Any]]:
@@ -73,10 +182,25 @@ def _extract_json(text: str) -> Optional[Dict[str, Any]]:
 
 
 class OpenAITranslator:
-    def __init__(self, api_key: str, model: str, reasoning_effort: str = "medium"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        reasoning_effort: str = "medium",
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+    ):
+        """
+        rpm/tpm: requests and tokens per minute to stay under (the account tier
+        limits); default from CKST_OPENAI_RPM / CKST_OPENAI_TPM, unset = unlimited.
+        """
         self.client = OpenAI(api_key=api_key)
         self.model = model
         self.reasoning_effort = reasoning_effort
+        self.rate_limiter = RateLimiter(
+            rpm if rpm is not None else _env_int("CKST_OPENAI_RPM"),
+            tpm if tpm is not None else _env_int("CKST_OPENAI_TPM"),
+        )
 
     def translate_batch(
         self,
@@ -90,7 +214,104 @@ class OpenAITranslator:
             return {}
 
         glossary = glossary or {}
+        system, user, keep_maps = self._build_prompt(items, source_lang, target_lang, glossary, extra_instructions)
+        # ~4 chars per token: the prompt, plus a reply about as long as the texts
+        est_tokens = (len(system) + len(user) + sum(len(it.text) for it in items)) // 4
+        self.rate_limiter.acquire(est_tokens)
+        text_out = self._call_model(system, user)
+        return self._parse_batch_output(items, text_out, keep_maps, glossary)
+
+    def translate_chunks_batch_api(
+        self,
+        chunks: List[List[TranslationItem]],
+        source_lang: str = "pt-BR",
+        target_lang: str = "en",
+        glossary: Optional[Dict[str, str]] = None,
+        extra_instructions: str = "",
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+    ) -> Dict[str, str]:
+        """
+        Translate all chunks through the OpenAI Batch API (one JSONL upload, one job):
+        half the price of real-time calls and separate rate limits, at the cost of
+        latency (completion window is 24h; we poll with exponential backoff).
+        Chunks missing from the output fall back to their original text.
+        """
+        chunks = [ch for ch in chunks if ch]
+        if not chunks:
+            return {}
+
+        glossary = glossary or {}
+        keep_maps: Dict[str, List[str]] = {}
+        lines: List[str] = []
+
+        for ci, ch in enumerate(chunks):
+            system, user, chunk_keep = self._build_prompt(ch, source_lang, target_lang, glossary, extra_instructions)
+            keep_maps.update(chunk_keep)
+            lines.append(
+                json.dumps(
+                    {
+                        "custom_id": f"chunk-{ci}",
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {
+                            "model": self.model,
+                            "messages": [
+                                {"role": "system", "content": system},
+                                {"role": "user", "content": user},
+                            ],
+                        },
+                    },
+                    ensure_ascii=False,
+                )
+            )
+
+        batch_file = self.client.files.create(
+            file=("translation_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+
+        delay = poll_interval
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(delay)
+            delay = min(max_poll_interval, delay * 1.5)
+            batch = self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"OpenAI batch {batch.id} ended with status '{batch.status}'.")
 
+        outputs: Dict[str, str] = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+                body = (rec.get("response") or {}).get("body") or {}
+                outputs[rec["custom_id"]] = body["choices"][0]["message"]["content"] or ""
+            except Exception:
+                continue
+
+        out: Dict[str, str] = {}
+        for ci, ch in enumerate(chunks):
+            out.update(self._parse_batch_output(ch, outputs.get(f"chunk-{ci}", ""), keep_maps, glossary))
+        return out
+
+    def _build_prompt(
+        self,
+        items: List[TranslationItem],
+        source_lang: str,
+        target_lang: str,
+        glossary: Dict[str, str],
+        extra_instructions: str,
+    ) -> Tuple[str, str, Dict[str, List[str]]]:
+        """
+        Returns (system, user, keep_maps) for one chunk of items.
+        """
         # Protect tokens per-item
         protected_payload = []
         keep_maps: Dict[str, List[str]] = {}
@@ -125,10 +346,18 @@ class OpenAITranslator:
             f"{json.dumps(protected_payload, ensure_ascii=False)}"
         )
 
-        text_out = self._call_model(system, user)
+        return system, user, keep_maps
 
+    def _parse_batch_output(
+        self,
+        items: List[TranslationItem],
+        text_out: str,
+        keep_maps: Dict[str, List[str]],
+        glossary: Dict[str, str],
+    ) -> Dict[str, str]:
         obj = _extract_json(text_out) or {}
         out: Dict[str, str] = {}
+        glossary_fix = compile_glossary(glossary)
 
         for it in items:
             raw = obj.get(it.id, None)
@@ -138,7 +367,7 @@ class OpenAITranslator:
             # restore protected
             restored = restore_protected(raw, keep_maps.get(it.id, []))
             # hard glossary cleanup (if PT leaked)
-            restored = apply_glossary_hard(restored, glossary)
+            restored = glossary_fix(restored)
             out[it.id] = restored
 
         return out
@@ -183,3 +412,103 @@ class OpenAITranslator:
             ],
         )
         return (cc.choices[0].message.content or "").strip()
+
+
+def with_retry(
+    fn: Callable[..., Any],
+    *args: Any,
+    attempts: int = 4,
+    base: float = 1.0,
+    cap: float = 30.0,
+    **kwargs: Any,
+) -> Any:
+    """
+    Call fn(*args, **kwargs), retrying RETRYABLE_ERRORS with exponential backoff
+    plus jitter: sleeps min(cap, base * 2**i) + U(0, 0.5) seconds between attempts.
+    The last failure is raised, so a chunk never silently comes back untranslated.
+    """
+    retrying = Retrying(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        stop=stop_after_attempt(attempts),
+        wait=wait_exponential(multiplier=base, max=cap) + wait_random(0, 0.5),
+        reraise=True,
+    )
+    return retrying(fn, *args, **kwargs)
+
+
+def batch_api_enabled(flag: Optional[bool] = None) -> bool:
+    """
+    Explicit flag wins; otherwise the CKST_USE_BATCH_API env var ("1", "true", "yes").
+    """
+    if flag is not None:
+        return bool(flag)
+    return os.getenv("CKST_USE_BATCH_API", "").strip().lower() in ("1", "true", "yes")
+
+
+def translate_chunks(
+    translator: OpenAITranslator,
+    chunks: Iterable[List[TranslationItem]],
+    source_lang: str = "pt-BR",
+    target_lang: str = "en",
+    glossary: Optional[Dict[str, str]] = None,
+    extra_instructions: str = "",
+    max_workers: int = 8,
+    on_chunk_done: Optional[Callable[[List[TranslationItem]], None]] = None,
+    use_batch_api: Optional[bool] = None,
+) -> Dict[str, str]:
+    """
+    Run translate_batch over independent chunks concurrently. The calls are
+    network-bound, so threads overlap the round trips: latency goes from
+    sum(chunks) to roughly max(chunks). Transient API errors are retried per
+    chunk (with_retry).
+    Returns the merged {item_id: translated}; on_chunk_done(chunk) is called on the
+    calling thread as each chunk completes (progress reporting).
+    chunks may be a lazy iterable (producer): each chunk is submitted as soon as
+    it is produced, so extraction of later pages overlaps the requests in flight.
+    The number of chunks is then unknown until the producer is exhausted. The
+    first on_chunk_done call comes only after that, so a count kept by the
+    producer is final by the time progress is reported (the PDF path relies on it).
+    With use_batch_api (default: CKST_USE_BATCH_API env flag) all chunks go into a
+    single OpenAI Batch API job instead.
+    """
+    mapping: Dict[str, str] = {}
+
+    if batch_api_enabled(use_batch_api):
+        # one job needs every chunk up front
+        chunks = [ch for ch in chunks if ch]
+        if not chunks:
+            return mapping
+        mapping = translator.translate_chunks_batch_api(
+            chunks,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            glossary=glossary,
+            extra_instructions=extra_instructions,
+        )
+        if on_chunk_done:
+            for ch in chunks:
+                on_chunk_done(ch)
+        return mapping
+
+    # Worker threads are started lazily, one per submit, up to max_workers
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        futures = {}
+        for ch in chunks:
+            if not ch:
+                continue
+            fut = ex.submit(
+                with_retry,
+                translator.translate_batch,
+                ch,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                glossary=glossary,
+                extra_instructions=extra_instructions,
+            )
+            futures[fut] = ch
+        for fut in as_completed(futures):
+            mapping.update(fut.result())
+            if on_chunk_done:
+                on_chunk_done(futures[fut])
+
+    return mapping
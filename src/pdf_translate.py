@@ -2,17 +2,33 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import re
 
 import fitz  # PyMuPDF
 import numpy as np
 
-from .openai_translate import OpenAITranslator
+from .openai_translate import (
+    CHUNK_MAX_CHARS,
+    CHUNK_MAX_ITEMS,
+    OpenAITranslator,
+    TranslationItem,
+    dedupe_items,
+    iter_chunks,
+    translate_chunks,
+)
+from .text_utils import is_translatable
 
 
 BULLET_ONLY_RE = re.compile(r"^[\s•●\u2022\-\–\—]+$")
 
+# Text extraction flags: no image blocks, no ligature glyph preservation
+_EXTRACT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_IMAGES & ~fitz.TEXT_PRESERVE_LIGATURES
+
+# Base14 fonts are built once at import and shared by every page's TextWriter
+_BASE14_FONTS = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Helvetica-BoldOblique")
+_FONT_CACHE: Dict[str, fitz.Font] = {name: fitz.Font(fontname=name) for name in _BASE14_FONTS}
+
 
 @dataclass
 class PdfLineItem:
@@ -106,129 +122,129 @@ def _sample_bg_color(img_rgb: np.ndarray, rect: fitz.Rect, matrix: fitz.Matrix)
     return (float(mean[0] / 255.0), float(mean[1] / 255.0), float(mean[2] / 255.0))
 
 
-def _insert_text_fit(
-    page: fitz.Page,
+def _get_font(fontname: str) -> fitz.Font:
+    font = _FONT_CACHE.get(fontname)
+    if font is None:
+        font = fitz.Font(fontname=fontname)
+        _FONT_CACHE[fontname] = font
+    return font
+
+
+def _textbox_fits(rect: fitz.Rect, text: str, font: fitz.Font, fontsize: float, align: int) -> bool:
+    # Lay out on a scratch writer: nothing is written to the page
+    try:
+        return not fitz.TextWriter(rect).fill_textbox(rect, text, font=font, fontsize=fontsize, align=align)
+    except ValueError:
+        # rect too short for even the first line at this size
+        return False
+
+
+def _estimate_fontsize(rect: fitz.Rect, text: str, font: fitz.Font, fontsize: float) -> float:
+    """
+    Largest size <= fontsize at which text should fit in rect, solved from the
+    font metrics (text width scales linearly with size) instead of trial layouts.
+    Exact for a single line; for wrapped text an area estimate.
+    """
+    w1 = font.text_length(text, fontsize=1)
+    if w1 <= 0:
+        return fontsize
+
+    asc = font.ascender
+    lh = font.ascender - font.descender
+    if lh <= 1:
+        lh = 1.2  # same fallback as fill_textbox
+
+    # first baseline must lie inside rect (fill_textbox starts at top + size*asc)
+    max_fs = min(fontsize, rect.height * 0.999 / max(asc, 0.1))
+    # one line: fill_textbox keeps 0.2*size from the left border
+    one_line = rect.width / (w1 + 0.2)
+    # several lines: total text area ~ rect area
+    wrapped = (rect.width * rect.height / (w1 * lh)) ** 0.5
+    return min(max_fs, max(one_line, wrapped))
+
+
+def _fill_text_fit(
+    writer: fitz.TextWriter,
     rect: fitz.Rect,
     text: str,
-    fontname: str,
+    font: fitz.Font,
     fontsize: float,
-    color: Tuple[float, float, float],
     align: int = fitz.TEXT_ALIGN_LEFT,
 ) -> None:
     """
-    Insert text into rect and shrink font until it fits (best effort).
+    Lay out text into rect on the page writer, at the largest font size that fits
+    (best effort). The size is computed up front; only wrapped text, where word
+    breaks waste space, may need a few extra layout checks.
     """
-    fs = max(4.0, float(fontsize or 10))
-    for _ in range(18):
-        rc = page.insert_textbox(
-            rect,
-            text,
-            fontname=fontname,
-            fontsize=fs,
-            color=color,
-            align=align,
-        )
-        if rc >= 0:
-            return
-        fs -= 0.75
-        if fs < 4.0:
+    fs = max(4.0, _estimate_fontsize(rect, text, font, max(4.0, float(fontsize or 10))))
+    for _ in range(6):
+        if fs <= 4.0 or _textbox_fits(rect, text, font, fs, align):
             break
+        fs = max(4.0, fs * 0.9)
 
     # final attempt (may overflow slightly, but prevents blank output)
-    page.insert_textbox(rect, text, fontname=fontname, fontsize=max(4.0, fs), color=color, align=align)
+    try:
+        writer.fill_textbox(rect, text, font=font, fontsize=fs, align=align)
+    except ValueError:
+        writer.append(rect.bl, text, font=font, fontsize=fs)
 
 
-def _extract_pdf_line_items(doc: fitz.Document) -> List[PdfLineItem]:
+def _extract_page_line_items(pno: int, page: fitz.Page) -> List[PdfLineItem]:
     items: List[PdfLineItem] = []
 
-    for pno in range(doc.page_count):
-        page = doc.load_page(pno)
-        d = page.get_text("dict")
+    # TEXTFLAGS_TEXT = the "dict" defaults minus TEXT_PRESERVE_IMAGES: image
+    # blocks (skipped below anyway) are never decoded into the page dict.
+    # Ligatures are expanded ("ﬁ" -> "fi"), which is also what the model wants.
+    d = page.get_text("dict", flags=_EXTRACT_FLAGS)
 
-        for block in d.get("blocks", []):
-            if block.get("type") != 0:
-                continue
+    for block in d.get("blocks", []):
+        if block.get("type") != 0:
+            continue
 
-            for line in block.get("lines", []):
-                spans = line.get("spans", [])
-                if not spans:
-                    continue
-
-                line_text = "".join(s.get("text", "") for s in spans).strip()
-                if not line_text:
-                    continue
-
-                # Skip bullet-only items (keeps “●” markers untouched)
-                if BULLET_ONLY_RE.match(line_text):
-                    continue
-
-                rect: Optional[fitz.Rect] = None
-                max_size = 0.0
-                fontname = "Helvetica"
-                color = (0.0, 0.0, 0.0)
-
-                for s in spans:
-                    srect = fitz.Rect(s["bbox"])
-                    rect = srect if rect is None else (rect | srect)
-                    max_size = max(max_size, float(s.get("size", 0) or 0))
-                    fontname = _pick_base14_font(s.get("font", ""))
-                    color = _int_to_rgb_floats(int(s.get("color", 0)))
-
-                if rect is None:
-                    continue
-
-                items.append(
-                    PdfLineItem(
-                        page_index=pno,
-                        rect=rect,
-                        text=line_text,
-                        fontname=fontname,
-                        fontsize=max_size or 10.0,
-                        color=color,
-                    )
-                )
+        for line in block.get("lines", []):
+            spans = line.get("spans", [])
+            if not spans:
+                continue
 
-    return items
+            line_text = "".join(s.get("text", "") for s in spans).strip()
+            if not line_text:
+                continue
 
+            # Skip bullet-only items (keeps “●” markers untouched)
+            if BULLET_ONLY_RE.match(line_text):
+                continue
 
-def _translate_texts(
-    translator: OpenAITranslator,
-    texts: List[str],
-    source_lang: str,
-    target_lang: str,
-    glossary: str,
-    extra_instructions: str,
-) -> List[str]:
-    # Try common translator APIs (keeps backward compatibility)
-    if hasattr(translator, "translate_texts"):
-        return translator.translate_texts(
-            texts=texts,
-            source_lang=source_lang,
-            target_lang=target_lang,
-            glossary=glossary,
-            extra_instructions=extra_instructions,
-        )
-    if hasattr(translator, "translate_many"):
-        return translator.translate_many(
-            texts, source_lang=source_lang, target_lang=target_lang, glossary=glossary, extra_instructions=extra_instructions
-        )
-
-    # Fallback to per-text calls
-    out: List[str] = []
-    for t in texts:
-        if hasattr(translator, "translate_text"):
-            out.append(
-                translator.translate_text(
-                    text=t,
-                    source_lang=source_lang,
-                    target_lang=target_lang,
-                    glossary=glossary,
-                    extra_instructions=extra_instructions,
+            # Line bbox = min/max over all span bboxes (no per-span Rect unions).
+            # Plain min/max: lines have a handful of spans, where building a
+            # NumPy array costs more than the reduction saves.
+            bboxes = [s["bbox"] for s in spans if s.get("bbox")]
+            if not bboxes:
+                continue
+            rect = fitz.Rect(
+                min(b[0] for b in bboxes),
+                min(b[1] for b in bboxes),
+                max(b[2] for b in bboxes),
+                max(b[3] for b in bboxes),
+            )
+            max_size = max((float(s.get("size", 0) or 0) for s in spans), default=0.0)
+
+            # Font/color follow the last span of the line
+            last = spans[-1]
+            fontname = _pick_base14_font(last.get("font", ""))
+            color = _int_to_rgb_floats(int(last.get("color", 0)))
+
+            items.append(
+                PdfLineItem(
+                    page_index=pno,
+                    rect=rect,
+                    text=line_text,
+                    fontname=fontname,
+                    fontsize=max_size or 10.0,
+                    color=color,
                 )
             )
-        else:
-            out.append(translator.translate(t))  # last resort
-    return out
+
+    return items
 
 
 def translate_pdf_bytes(
@@ -236,68 +252,151 @@ def translate_pdf_bytes(
     translator: OpenAITranslator,
     source_lang: str,
     target_lang: str,
-    glossary: str,
+    glossary: Optional[Dict[str, str]],
     extra_instructions: str,
     progress_callback: Optional[Callable] = None,
+    max_workers: int = 8,
+    use_batch_api: Optional[bool] = None,
 ) -> bytes:
     """
     Translate a PDF by replacing text on the SAME page/positions.
     Fixes the common bug where apply_redactions() is called AFTER inserting translated text.
     Also preserves colored headers by sampling background color for redaction fill.
+    Chunks are translated concurrently (network-bound); the document itself is only
+    mutated on the calling thread, page by page, since PyMuPDF is not thread-safe.
+    use_batch_api=True (or CKST_USE_BATCH_API=1) routes every chunk through one
+    OpenAI Batch API job instead: half price, but minutes-to-hours of latency.
     """
+    glossary = glossary or {}
     doc = fitz.open(stream=file_bytes, filetype="pdf")
 
-    # Gather items per page (keeps layout stable, and lets us redact then write)
-    all_items = _extract_pdf_line_items(doc)
-
-    # Group items by page
-    items_by_page: List[List[PdfLineItem]] = [[] for _ in range(doc.page_count)]
-    for it in all_items:
-        items_by_page[it.page_index].append(it)
-
-    for pno in range(doc.page_count):
-        page = doc.load_page(pno)
+    # Load every page handle once; extraction and redaction reuse the same objects
+    pages = [doc.load_page(pno) for pno in range(doc.page_count)]
+
+    # Items per page (keeps layout stable, and lets us redact then write)
+    items_by_page: List[List[PdfLineItem]] = [[] for _ in pages]
+    page_tr_items: List[List[TranslationItem]] = [[] for _ in pages]
+    # Cross-page translation memory: a line text repeated on several pages
+    # (headers, footers, boilerplate) is sent once, by the first page that has it
+    first_id: Dict[str, str] = {}
+    alias: Dict[str, str] = {}
+    n_chunks = 0
+    done = 0
+
+    def _unique_items():
+        # Producer: extract page by page on this thread (PyMuPDF); full chunks
+        # go to the pool right away, so requests for earlier pages are in
+        # flight while later pages are still being parsed
+        for pno, page in enumerate(pages):
+            page_items = _extract_page_line_items(pno, page)
+            tr_items = [TranslationItem(f"p{pno}_l{i}", it.text) for i, it in enumerate(page_items)]
+            items_by_page[pno] = page_items
+            page_tr_items[pno] = tr_items
+
+            # Lines that would come back unchanged (codes, prices, URLs) stay
+            # extracted, so they are still redrawn if a redaction overlaps them,
+            # but are not sent
+            unique, page_alias = dedupe_items((ti for ti in tr_items if is_translatable(ti.text)), first_id)
+            alias.update(page_alias)
+            yield from unique
+
+    def _chunks():
+        # One global pool of lines cut into bounded chunks: sparse pages no
+        # longer cost one small request each, dense pages no longer one huge one
+        nonlocal n_chunks
+        for ch in iter_chunks(_unique_items(), max_items=CHUNK_MAX_ITEMS, max_chars=CHUNK_MAX_CHARS):
+            n_chunks += 1
+            yield ch
+
+    def _chunk_done(ch: List[TranslationItem]) -> None:
+        nonlocal done
+        done += 1
+        _safe_progress(progress_callback, f"PDF: translated {done}/{n_chunks} chunks", done / n_chunks)
+
+    # Results are applied in page order below
+    mapping = translate_chunks(
+        translator,
+        _chunks(),
+        source_lang=source_lang,
+        target_lang=target_lang,
+        glossary=glossary,
+        extra_instructions=extra_instructions,
+        max_workers=max_workers,
+        on_chunk_done=_chunk_done,
+        use_batch_api=use_batch_api,
+    )
+
+    for pno in range(len(pages)):
+        # Take the handle out of the list: it is released after this pass,
+        # whether the page gets rewritten or skipped
+        page, pages[pno] = pages[pno], None
         page_items = items_by_page[pno]
         _safe_progress(progress_callback, f"PDF: page {pno+1}/{doc.page_count}", (pno / max(1, doc.page_count)))
 
         if not page_items:
             continue
 
+        translations = [mapping.get(alias.get(ti.id, ti.id), ti.text) for ti in page_tr_items[pno]]
+
+        # Only rewrite lines whose translation differs (codes, numbers and
+        # already-English text keep their native glyphs). An unchanged line that
+        # overlaps a rewritten one is rewritten too, since the redaction would
+        # clip it anyway.
+        changed = [it.rect for it, tr in zip(page_items, translations) if tr != it.text]
+        if not changed:
+            continue
+        rewrite = [
+            (it, tr)
+            for it, tr in zip(page_items, translations)
+            if tr != it.text or any(it.rect.intersects(r) for r in changed)
+        ]
+
         # Render once for background sampling
         mat = fitz.Matrix(2, 2)  # decent quality for color sampling
         img_rgb = _render_page_rgb(page, mat)
 
-        texts = [it.text for it in page_items]
-        translations = _translate_texts(
-            translator=translator,
-            texts=texts,
-            source_lang=source_lang,
-            target_lang=target_lang,
-            glossary=glossary,
-            extra_instructions=extra_instructions,
-        )
-
         # 1) Add ALL redactions first (with sampled bg fill), 2) apply once, 3) insert translations
-        for it in page_items:
+        for it, _ in rewrite:
             bg = _sample_bg_color(img_rgb, it.rect, mat)
             page.add_redact_annot(it.rect, fill=bg)
 
         # IMPORTANT: apply redactions BEFORE inserting translated text
         page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
 
-        # Now place translated text
-        for it, tr in zip(page_items, translations):
-            _insert_text_fit(
-                page=page,
+        # Now place translated text: one TextWriter per colour, one content-stream
+        # append per writer instead of one insert_textbox() per line
+        writers: Dict[Tuple[float, float, float], fitz.TextWriter] = {}
+        for it, tr in rewrite:
+            writer = writers.get(it.color)
+            if writer is None:
+                writer = fitz.TextWriter(page.rect, color=it.color)
+                writers[it.color] = writer
+            _fill_text_fit(
+                writer=writer,
                 rect=it.rect,
                 text=tr,
-                fontname=it.fontname,
+                font=_get_font(it.fontname),
                 fontsize=it.fontsize,
-                color=it.color,
                 align=fitz.TEXT_ALIGN_LEFT,
             )
+        for writer in writers.values():
+            writer.write_text(page)
+
+        # Merge the original and appended content streams into one compact stream
+        page.clean_contents()
+    page = None  # the last page's handle too
 
     _safe_progress(progress_callback, "PDF: done", 1.0)
-    out = doc.tobytes()
+    # TextWriter embeds the Base14 font programs; keep only the glyphs used
+    doc.subset_fonts()
+    # garbage=1 drops the objects orphaned by apply_redactions() without the
+    # full xref compaction of garbage=4; object streams keep the output small.
+    out = doc.tobytes(
+        garbage=1,
+        deflate=True,
+        deflate_images=True,
+        deflate_fonts=True,
+        use_objstms=1,
+    )
     doc.close()
     return out
@@ -1,10 +1,64 @@
 import io
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional
 
 from pptx import Presentation
 
-from .openai_translate import OpenAITranslator, TranslationItem, chunk_items
-from .text_utils import apply_glossary_hard
+from .openai_translate import (
+    CHUNK_MAX_CHARS,
+    CHUNK_MAX_ITEMS,
+    OpenAITranslator,
+    TranslationItem,
+    dedupe_items,
+    iter_chunks,
+    translate_chunks,
+)
+from .text_utils import compile_glossary, is_translatable
+
+
+def _collect_slide_items(si: int, slide, items: List[TranslationItem], ptrs: List[tuple]) -> None:
+    """
+    Append one TranslationItem per non-empty paragraph of the slide to items, and
+    (item_id, paragraph, sample_run) to ptrs for the write-back.
+    """
+    for shape_index, shape in enumerate(slide.shapes):
+        if not getattr(shape, "has_text_frame", False):
+            continue
+        tf = shape.text_frame
+        if tf is None:
+            continue
+
+        for pi, p in enumerate(tf.paragraphs):
+            # p.runs re-queries the XML on every access: read it once
+            runs = p.runs
+            text = "".join(run.text for run in runs) if runs else (p.text or "")
+            # Numbers, prices, codes, URLs: the model would return them unchanged
+            if not is_translatable(text):
+                continue
+
+            item_id = f"s{si}_sh{shape_index}_p{pi}"
+            items.append(TranslationItem(item_id, text))
+            ptrs.append((item_id, p, runs[0] if runs else None))
+
+
+def _rewrite_paragraph(paragraph, new_text: str, sample_run) -> None:
+    """
+    Preserve style: rewrite paragraph to a single run
+    This may simplify formatting, but keeps box positioning.
+    If you need strict per-run formatting, we can do a more advanced run mapping later.
+    """
+    paragraph.text = new_text
+    if sample_run is not None and paragraph.runs:
+        r0 = paragraph.runs[0]
+        try:
+            r0.font.name = sample_run.font.name
+            r0.font.size = sample_run.font.size
+            r0.font.bold = sample_run.font.bold
+            r0.font.italic = sample_run.font.italic
+            r0.font.underline = sample_run.font.underline
+            if sample_run.font.color and sample_run.font.color.rgb:
+                r0.font.color.rgb = sample_run.font.color.rgb
+        except Exception:
+            pass
 
 
 def translate_pptx_bytes(
@@ -15,88 +69,74 @@ def translate_pptx_bytes(
     glossary: Optional[Dict[str, str]] = None,
     extra_instructions: str = "",
     on_progress: Optional[Callable[[str, int, int], None]] = None,
+    max_workers: int = 8,
+    use_batch_api: Optional[bool] = None,
 ) -> bytes:
     """
     Translates PPTX text in-place (same slides/shapes).
+    Chunks are sent to the translator concurrently (up to max_workers at a time),
+    or as a single OpenAI Batch API job with use_batch_api=True / CKST_USE_BATCH_API=1.
     """
     glossary = glossary or {}
 
     prs = Presentation(io.BytesIO(pptx_bytes))
 
-    # Collect paragraph-level items
-    items = []
-    ptrs = []  # (item_id, paragraph, sample_run)
+    # Paragraph-level items from ALL slides go into one global pool: few, full
+    # chunks instead of many tiny per-slide requests
+    ptrs: List[tuple] = []  # (item_id, paragraph, sample_run)
+    first_id: Dict[str, str] = {}
+    alias: Dict[str, str] = {}
+    total_items = 0
+    done = 0
 
     total_slides = len(prs.slides)
     if on_progress:
         on_progress("slides", 0, max(1, total_slides))
 
-    for si, slide in enumerate(prs.slides):
-        if on_progress:
-            on_progress("slides", si + 1, max(1, total_slides))
-
-        for shape_index, shape in enumerate(slide.shapes):
-            if not getattr(shape, "has_text_frame", False):
-                continue
-            tf = shape.text_frame
-            if tf is None:
-                continue
-
-            for pi, p in enumerate(tf.paragraphs):
-                text = "".join(run.text for run in p.runs) if p.runs else (p.text or "")
-                if not text or not text.strip():
-                    continue
-
-                # skip pure placeholders/codes maybe? (translator protection already helps)
-                item_id = f"s{si}_sh{shape_index}_p{pi}"
-                items.append(TranslationItem(item_id, text))
-                sample_run = p.runs[0] if p.runs else None
-                ptrs.append((item_id, p, sample_run))
-
-    # Translate in large chunks
-    mapping: Dict[str, str] = {}
-    total_items = len(items)
-    done = 0
-    if on_progress:
-        on_progress("text", 0, max(1, total_items))
-
-    for ch in chunk_items(items):
-        mapping.update(
-            translator.translate_batch(
-                ch,
-                source_lang=source_lang,
-                target_lang=target_lang,
-                glossary=glossary,
-                extra_instructions=extra_instructions,
-            )
-        )
+    def _unique_items():
+        # Producer: collect slide by slide; each full chunk is sent while the
+        # following slides are still being walked
+        nonlocal total_items
+        for si, slide in enumerate(prs.slides):
+            if on_progress:
+                on_progress("slides", si + 1, max(1, total_slides))
+
+            items: List[TranslationItem] = []
+            _collect_slide_items(si, slide, items, ptrs)
+            # Identical paragraphs (repeated headers/footers/labels) are translated once
+            unique, slide_alias = dedupe_items(items, first_id)
+            alias.update(slide_alias)
+            total_items += len(unique)
+            yield from unique
+
+    def _chunk_done(ch: List[TranslationItem]) -> None:
+        nonlocal done
         done += len(ch)
         if on_progress:
             on_progress("text", min(done, total_items), max(1, total_items))
 
-    # Write back
+    # Translate in large chunks, all chunks in flight concurrently
+    mapping = translate_chunks(
+        translator,
+        iter_chunks(_unique_items(), max_items=CHUNK_MAX_ITEMS, max_chars=CHUNK_MAX_CHARS),
+        source_lang=source_lang,
+        target_lang=target_lang,
+        glossary=glossary,
+        extra_instructions=extra_instructions,
+        max_workers=max_workers,
+        on_chunk_done=_chunk_done,
+        use_batch_api=use_batch_api,
+    )
+
+    # Write back (hard glossary pass compiled once, not per paragraph)
+    glossary_fix = compile_glossary(glossary)
     for item_id, paragraph, sample_run in ptrs:
-        new_text = mapping.get(item_id, None)
+        new_text = mapping.get(alias[item_id], None)
         if not new_text:
             continue
-        new_text = apply_glossary_hard(new_text, glossary)
-
-        # Preserve style: rewrite paragraph to a single run
-        # This may simplify formatting, but keeps box positioning.
-        # If you need strict per-run formatting, we can do a more advanced run mapping later.
-        paragraph.text = new_text
-        if sample_run is not None and paragraph.runs:
-            r0 = paragraph.runs[0]
-            try:
-                r0.font.name = sample_run.font.name
-                r0.font.size = sample_run.font.size
-                r0.font.bold = sample_run.font.bold
-                r0.font.italic = sample_run.font.italic
-                r0.font.underline = sample_run.font.underline
-                if sample_run.font.color and sample_run.font.color.rgb:
-                    r0.font.color.rgb = sample_run.font.color.rgb
-            except Exception:
-                pass
+        new_text = glossary_fix(new_text)
+
+        _rewrite_paragraph(paragraph, new_text, sample_run)
 
     out = io.BytesIO()
     prs.save(out)
@@ -1,5 +1,6 @@
 import re
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 def parse_glossary_lines(text: str) -> Dict[str, str]:
@@ -26,6 +27,81 @@ def parse_glossary_lines(text: str) -> Dict[str, str]:
     return out
 
 
+def _trie_regex(keys: List[str]) -> str:
+    """
+    Regex source matching any of keys, laid out as a character trie. Same matches
+    as the longest-first alternation (the longest key wins at any position), but
+    the engine follows one branch per character instead of trying every key.
+    """
+    trie: Dict[str, dict] = {}
+    for k in keys:
+        node = trie
+        for ch in k:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # a key ends here
+
+    def _build(node: dict) -> str:
+        alts = [re.escape(ch) + _build(child) for ch, child in node.items() if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            # greedy: try the longer keys first, else stop at this one
+            return "(?:" + body + ")?"
+        return body
+
+    return _build(trie)
+
+
+@lru_cache(maxsize=32)
+def _compile_glossary(items: Tuple[Tuple[str, str], ...]) -> Tuple[Optional["re.Pattern[str]"], Dict[str, str]]:
+    """
+    One case-insensitive pattern over all glossary keys (the longest key wins at
+    any position), plus a lowercase key -> EN lookup.
+    Cached per glossary: compiled once per document, not once per string.
+    """
+    lookup: Dict[str, str] = {}
+    for pt, en in items:
+        if pt:
+            lookup.setdefault(pt.lower(), en)
+    if not lookup:
+        return None, lookup
+    pattern = re.compile(_trie_regex(list(lookup)), re.IGNORECASE)
+    return pattern, lookup
+
+
+def compile_glossary(glossary: Dict[str, str]) -> Callable[[str], str]:
+    """
+    apply_glossary_hard bound to one glossary: resolve the compiled pattern once,
+    then call the returned function for every string of a write-back loop.
+    """
+    if not glossary:
+        return lambda text: text
+
+    # Replace longer keys first to avoid partial collisions; single pass
+    pattern, lookup = _compile_glossary(tuple(glossary.items()))
+    if pattern is None:
+        return lambda text: text
+
+    def _repl(m: re.Match) -> str:
+        return lookup.get(m.group(0).lower(), m.group(0))
+
+    def _apply(text: str) -> str:
+        return pattern.sub(_repl, text) if text else text
+
+    return _apply
+
+
+def glossary_terms(glossary: Dict[str, str]) -> Dict[str, str]:
+    """
+    Lowercase PT term -> EN of the glossary (first entry wins, as in the hard pass),
+    for looking up strings that are exactly one glossary term.
+    """
+    if not glossary:
+        return {}
+    return _compile_glossary(tuple(glossary.items()))[1]
+
+
 def apply_glossary_hard(english_text: str, glossary: Dict[str, str]) -> str:
     """
     If any PT terms leaked into output, replace them hard with EN.
@@ -33,16 +109,7 @@ def apply_glossary_hard(english_text: str, glossary: Dict[str, str]) -> str:
     """
     if not glossary or not english_text:
         return english_text
-
-    out = english_text
-    # Replace longer keys first to avoid partial collisions
-    for pt in sorted(glossary.keys(), key=len, reverse=True):
-        en = glossary[pt]
-        # whole-word-ish replacement (but allow accents/spaces)
-        pattern = re.compile(re.escape(pt), re.IGNORECASE)
-        out = pattern.sub(en, out)
-
-    return out
+    return compile_glossary(glossary)(english_text)
 
 
 _KEEP_PATTERNS = [
@@ -65,27 +132,39 @@ _KEEP_PATTERNS = [
     r"\[[^\]]+\]",
 ]
 
+# All patterns in one alternation, compiled once: one scan per string
+_KEEP_RE = re.compile("|".join(f"({p})" for p in _KEEP_PATTERNS), re.IGNORECASE)
+# Every _KEEP_PATTERNS entry needs a digit, "{" or "[": strings without one
+# (most plain-word labels) skip the big alternation entirely
+_KEEP_HINT_RE = re.compile(r"[\d{\[]")
+
+# Placeholders written by protect_text
+_PLACEHOLDER_RE = re.compile(r"__KEEP(\d+)__")
+
+# Any Unicode letter (word chars minus digits/underscore)
+_LETTER_RE = re.compile(r"[^\W\d_]")
+# Bare URL / e-mail address
+_LINK_RE = re.compile(r"(?:https?://|www\.)\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+", re.IGNORECASE)
+
 
 def protect_text(text: str) -> Tuple[str, List[str]]:
     """
     Replaces protected tokens with placeholders __KEEP0__, __KEEP1__...
     Returns (protected_text, keep_list)
     """
-    if not text:
+    if not text or not _KEEP_HINT_RE.search(text):
         return text, []
 
     keep: List[str] = []
     protected = text
 
-    combined = re.compile("|".join(f"({p})" for p in _KEEP_PATTERNS), re.IGNORECASE)
-
     def _repl(m: re.Match) -> str:
         token = m.group(0)
         idx = len(keep)
         keep.append(token)
         return f"__KEEP{idx}__"
 
-    protected = combined.sub(_repl, protected)
+    protected = _KEEP_RE.sub(_repl, protected)
     return protected, keep
 
 
@@ -93,7 +172,25 @@ def restore_protected(text: str, keep_list: List[str]) -> str:
     if not keep_list or not text:
         return text
 
-    out = text
-    for i, tok in enumerate(keep_list):
-        out = out.replace(f"__KEEP{i}__", tok)
-    return out
+    def _repl(m: re.Match) -> str:
+        i = int(m.group(1))
+        return keep_list[i] if i < len(keep_list) else m.group(0)
+
+    # one pass over the text instead of one str.replace scan per placeholder
+    return _PLACEHOLDER_RE.sub(_repl, text)
+
+
+def is_translatable(text: str) -> bool:
+    """
+    False for strings the model would return unchanged anyway, so they need not
+    be sent: no letters at all (numbers, prices, dates, bullets), a bare URL or
+    e-mail, or nothing but protected tokens (codes, measurements) and punctuation.
+    """
+    t = (text or "").strip()
+    if not t or not _LETTER_RE.search(t):
+        return False
+    if _LINK_RE.fullmatch(t):
+        return False
+    if not _KEEP_HINT_RE.search(t):
+        return True
+    return _LETTER_RE.search(_KEEP_RE.sub(" ", t)) is not None
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "ckst-translation" / "tm.sqlite"
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def context_digest(context: Hashable) -> str:
+    """
+    Fixed-size digest of everything that changes a translation (model, effort,
+    languages, glossary, instructions). Compute it once per run and key both
+    caches with it: the context can hold a long glossary, which would otherwise
+    be repr'd and hashed again for every text.
+    """
+    return hashlib.blake2b(repr(context).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_key(digest: str, text: str) -> str:
+    # Fixed-size row key; a changed glossary gives another digest, so other rows
+    return hashlib.blake2b(f"{digest}\x00{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TranslationCache:
+    """
+    On-disk translation memory, persisted across runs and app restarts.
+    Same interface as MemoryTranslationCache: entries are keyed by (context_digest, source text).
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv("CKST_TRANSLATION_CACHE_PATH") or DEFAULT_CACHE_PATH).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        # WAL: concurrent sessions can keep reading while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT NOT NULL, ts INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, digest: str, texts: Iterable[str]) -> Dict[str, str]:
+        """
+        Return {source text: cached translation} for the texts found in the cache.
+        """
+        by_key = {_cache_key(digest, text): text for text in texts}
+        keys = list(by_key)
+        found: Dict[str, str] = {}
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            part = keys[i : i + _LOOKUP_BATCH]
+            rows = self._conn.execute(
+                "SELECT key, value FROM translations WHERE key IN (%s)" % ",".join("?" * len(part)),
+                part,
+            )
+            for key, value in rows:
+                found[by_key[key]] = value
+        return found
+
+    def put_many(self, digest: str, pairs: Iterable[Tuple[str, str]]) -> None:
+        now = int(time.time())
+        rows: List[Tuple[str, str, int]] = [(_cache_key(digest, src), tgt, now) for src, tgt in pairs]
+        if not rows:
+            return
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO translations (key, value, ts) VALUES (?, ?, ?)", rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class MemoryTranslationCache:
+    """
+    Bounded in-process LRU of recent translations, shared across files and reruns
+    (callers gate it behind translation_cache_enabled, like the on-disk memory).
+    Entries are keyed by (context_digest, source text); the digest should cover
+    everything that changes the output (model, reasoning effort, languages, glossary,
+    instructions).
+    """
+
+    def __init__(self, maxsize: int = 50_000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, digest: str, texts: Iterable[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for text in texts:
+                key = (digest, text)
+                value = self._data.get(key)
+                if value is not None:
+                    self._data.move_to_end(key)
+                    found[text] = value
+        return found
+
+    def put_many(self, digest: str, pairs: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            for src, tgt in pairs:
+                self._data[(digest, src)] = tgt
+                self._data.move_to_end((digest, src))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+MEMORY_CACHE = MemoryTranslationCache()
+
+
+def translation_cache_enabled(flag: Optional[bool] = None) -> bool:
+    """
+    Explicit flag wins; otherwise the CKST_TRANSLATION_CACHE env var ("1", "true", "yes").
+    """
+    if flag is not None:
+        return bool(flag)
+    return os.getenv("CKST_TRANSLATION_CACHE", "").strip().lower() in ("1", "true", "yes")
@@ -1,19 +1,32 @@
 import io
 import re
-from typing import Callable, Dict, List, Optional, Tuple
+import tempfile
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import openpyxl
+from openpyxl.cell.cell import Cell
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.writer.excel import ExcelWriter
 
-from .excel_convert import convert_office_bytes
-from .openai_translate import OpenAITranslator, TranslationItem
-from .text_utils import apply_glossary_hard
+from .excel_convert import convert_office_bytes, convert_office_file
+from .openai_translate import OpenAITranslator, TranslationItem, dedupe_items, iter_chunks, translate_chunks
+from .text_utils import compile_glossary, glossary_terms, is_translatable
+from .translation_cache import MEMORY_CACHE, TranslationCache, context_digest, translation_cache_enabled
 
 
+_WS_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=8192)
 def _norm(s: str) -> str:
+    # Cached: the same labels repeat across rows and sheets
     s = (s or "").replace("\u00A0", " ").strip().upper()
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
     s = s.rstrip(" .:;,-")
     return s
 
@@ -34,11 +47,53 @@ def _parse_print_area(print_area: str) -> List[CellRange]:
     return ranges
 
 
-def _cell_in_ranges(r: int, c: int, ranges: List[CellRange]) -> bool:
+def _sheet_print_ranges(ws) -> List[CellRange]:
+    """
+    Print area ranges of the sheet. openpyxl already holds them parsed
+    (ws._print_area.ranges); the print_area string is only re-parsed as a fallback,
+    since splitting it on "," breaks on quoted sheet names containing commas.
+    """
+    ranges = getattr(getattr(ws, "_print_area", None), "ranges", None)
+    if ranges:
+        return list(ranges)
+    return _parse_print_area(getattr(ws, "print_area", "") or "")
+
+
+def _split_cells_by_area(
+    ws, ranges: List[CellRange], min_row: int, max_row: int, min_col: int, max_col: int
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Partition the sheet's populated cells (ws._cells keys, row-major) into
+    (inside the print blocks, inside the union but outside every block).
+    The blocks are painted once into a boolean mask over the union, then all
+    cells are classified with one vectorized lookup instead of a per-cell test.
+    """
+    keys = sorted(ws._cells)
+    if not keys:
+        return [], []
+
+    rc = np.array(keys, dtype=np.int64)
+    r = rc[:, 0] - min_row
+    c = rc[:, 1] - min_col
+    height, width = max_row - min_row + 1, max_col - min_col + 1
+    in_union = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+
+    # The usual single-block print area is the union itself: no mask to paint
+    # and nothing to clear
+    if len(ranges) == 1:
+        return [keys[i] for i in np.flatnonzero(in_union)], []
+
+    mask = np.zeros((height, width), dtype=bool)
     for cr in ranges:
-        if cr.min_row <= r <= cr.max_row and cr.min_col <= c <= cr.max_col:
-            return True
-    return False
+        mask[cr.min_row - min_row : cr.max_row - min_row + 1, cr.min_col - min_col : cr.max_col - min_col + 1] = True
+
+    inside = np.zeros(len(keys), dtype=bool)
+    inside[in_union] = mask[r[in_union], c[in_union]]
+
+    return (
+        [keys[i] for i in np.flatnonzero(inside)],
+        [keys[i] for i in np.flatnonzero(in_union & ~inside)],
+    )
 
 
 def _union_bounds(ranges: List[CellRange]) -> Tuple[int, int, int, int]:
@@ -70,16 +125,20 @@ def _unmerge_outside_union(ws, min_row: int, max_row: int, min_col: int, max_col
 
 
 def _crop_sheet_to_union(ws, min_row: int, max_row: int, min_col: int, max_col: int) -> None:
-    # Delete outside bounds; after this, everything remaining is print area union
-    if ws.max_row > max_row:
-        ws.delete_rows(max_row + 1, ws.max_row - max_row)
-    if min_row > 1:
-        ws.delete_rows(1, min_row - 1)
-
-    if ws.max_column > max_col:
-        ws.delete_cols(max_col + 1, ws.max_column - max_col)
-    if min_col > 1:
-        ws.delete_cols(1, min_col - 1)
+    # Delete outside bounds; after this, everything remaining is print area union.
+    # One pass over the existing cells, rebasing the kept ones to A1: each
+    # delete_rows/delete_cols call re-walks the whole sheet (and pads the grid
+    # with empty cells while doing so)
+    cells = ws._cells
+    kept = {}
+    for (r, c), cell in cells.items():
+        if min_row <= r <= max_row and min_col <= c <= max_col:
+            cell.row = r - min_row + 1
+            cell.column = c - min_col + 1
+            kept[(cell.row, cell.column)] = cell
+    cells.clear()
+    cells.update(kept)
+    ws._current_row = ws.max_row if cells else 0
 
     try:
         ws.print_title_rows = None
@@ -88,42 +147,49 @@ def _crop_sheet_to_union(ws, min_row: int, max_row: int, min_col: int, max_col:
         pass
 
     try:
-        last_col = get_column_letter(ws.max_column if ws.max_column >= 1 else 1)
-        last_row = ws.max_row if ws.max_row >= 1 else 1
+        # The union's own size, not ws.max_row/max_column: trailing empty rows
+        # and columns of the print area have no cells but stay in the area
+        last_col = get_column_letter(max(1, max_col - min_col + 1))
+        last_row = max(1, max_row - min_row + 1)
         ws.print_area = f"$A$1:${last_col}${last_row}"
     except Exception:
         pass
 
 
+# Text per batch (~3000 tokens at ~4 chars/token): batches of short labels and
+# batches of long notes then take about the same time, with no slow stragglers
+BATCH_MAX_CHARS = 12000
+
+
 def _chunk_list(items: List[TranslationItem], chunk_size: int) -> List[List[TranslationItem]]:
-    if chunk_size <= 0:
-        return [items]
-    return [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    # chunk_size caps the items per batch (<= 0: no item cap), BATCH_MAX_CHARS the text
+    max_items = chunk_size if chunk_size > 0 else max(1, len(items))
+    return list(iter_chunks(items, max_items=max_items, max_chars=BATCH_MAX_CHARS))
 
 
-def _find_afio_headers(ws, ranges: List[CellRange]) -> List[Tuple[int, int]]:
+def _pick_afio_headers(found: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
     """
-    Find cells equal to 'AFIO' inside the print area.
+    Choose the AFIO headers among the cells equal to 'AFIO' inside the print area.
     Prefer column G (7).
     Returns list of (row, col).
     """
-    found: List[Tuple[int, int]] = []
-    found_col7: List[Tuple[int, int]] = []
-    for cr in ranges:
-        for row in ws.iter_rows(min_row=cr.min_row, max_row=cr.max_row, min_col=cr.min_col, max_col=cr.max_col):
-            for cell in row:
-                if isinstance(cell.value, str) and _norm(cell.value) == "AFIO":
-                    found.append((cell.row, cell.column))
-                    if cell.column == 7:
-                        found_col7.append((cell.row, cell.column))
+    found_col7 = [(r, c) for r, c in found if c == 7]
     return found_col7 if found_col7 else found
 
 
-def _under_any_afio_header(r: int, c: int, headers: List[Tuple[int, int]]) -> bool:
-    return any(c == hc and r > hr for hr, hc in headers)
+def _afio_first_row_by_col(headers: List[Tuple[int, int]]) -> Dict[int, int]:
+    """
+    column -> row of its topmost AFIO header: a cell is under a header of its
+    column iff it lies below that row, so the check is one dict lookup.
+    """
+    first: Dict[int, int] = {}
+    for hr, hc in headers:
+        if hr < first.get(hc, hr + 1):
+            first[hc] = hr
+    return first
 
 
-def translate_workbook_bytes_openpyxl(
+def _translate_workbook(
     workbook_bytes: bytes,
     translator: OpenAITranslator,
     source_lang: str,
@@ -132,11 +198,20 @@ def translate_workbook_bytes_openpyxl(
     extra_instructions: str,
     on_progress: Optional[Callable[[str, int, int], None]],
     batch_size: int,
-) -> bytes:
+    max_workers: int = 8,
+    use_translation_cache: Optional[bool] = None,
+    use_batch_api: Optional[bool] = None,
+) -> openpyxl.Workbook:
     """
-    Translate xlsx/xlsm bytes using openpyxl.
+    Translate xlsx/xlsm bytes using openpyxl; returns the translated (unsaved) workbook.
     Enforces: translate ONLY inside print area; delete everything outside print area union.
     Special rule: Under AFIO column, if cell == 'NA COR', copy column C from same row (post-translation).
+    All sheets are collected first; the batches of the whole workbook are then sent
+    concurrently (up to max_workers at a time), or as a single OpenAI Batch API job with
+    use_batch_api=True / CKST_USE_BATCH_API=1 (half the cost, results within 24h).
+    With use_translation_cache=True / CKST_TRANSLATION_CACHE=1, strings translated
+    earlier in this process or found in the on-disk translation memory (same model,
+    reasoning effort, languages, glossary and instructions) are not sent again.
     """
     # Try keep_vba=True first (safe for xlsm); if fails, retry without
     try:
@@ -144,104 +219,248 @@ def translate_workbook_bytes_openpyxl(
     except Exception:
         wb = openpyxl.load_workbook(io.BytesIO(workbook_bytes), keep_vba=False, data_only=False)
 
+    # Hard glossary pass, compiled once for the whole workbook
+    glossary_fix = compile_glossary(glossary)
+
+    # Workbook-wide translation memory: a string repeated in any cell of any
+    # sheet (headers, units, boilerplate) is sent once
+    items: List[TranslationItem] = []
+    # Item ids are a workbook-wide running number: no per-cell "Sheet!A1"
+    # formatting, and shorter JSON keys in the prompt and the reply
+    next_id = 0
+    # Per sheet: (ws, coords, na_cor_targets, outside, union bounds)
+    plans: List[tuple] = []
+
     sheets = wb.worksheets
     total_sheets = max(1, len(sheets))
     if on_progress:
         on_progress("pages", 0, total_sheets)
 
+    # Pass 1: collect every sheet, so the batches of all sheets go out
+    # together instead of one sheet's requests at a time
     for s_idx, ws in enumerate(sheets, start=1):
         if on_progress:
             on_progress("pages", s_idx, total_sheets)
 
-        ranges = _parse_print_area(getattr(ws, "print_area", "") or "")
+        ranges = _sheet_print_ranges(ws)
         if not ranges:
             continue
 
-        min_row, max_row, min_col, max_col = _union_bounds(ranges)
-        _unmerge_outside_union(ws, min_row, max_row, min_col, max_col)
-
-        afio_headers = _find_afio_headers(ws, ranges)
-        na_cor_targets: List[Tuple[int, int]] = []  # (row, afio_col)
+        bounds = _union_bounds(ranges)
+        _unmerge_outside_union(ws, *bounds)
 
-        items: List[TranslationItem] = []
-        coords: List[Tuple[str, int, int]] = []
+        # openpyxl keeps existing cells in ws._cells keyed by (row, col): look them
+        # up directly instead of going through ws.cell() / iter_rows(), which
+        # create (and later save) an empty Cell for every coordinate they visit
+        cells = ws._cells
+        inside, outside = _split_cells_by_area(ws, ranges, *bounds)
 
-        for cr in ranges:
-            for row in ws.iter_rows(
-                min_row=cr.min_row,
-                max_row=cr.max_row,
-                min_col=cr.min_col,
-                max_col=cr.max_col,
-            ):
-                for cell in row:
-                    v = cell.value
-                    if not isinstance(v, str):
-                        continue
-
-                    raw = v
-                    txt = raw.strip()
-                    if not txt:
-                        continue
-
-                    # Skip formulas
-                    if cell.data_type == "f" or txt.startswith("="):
-                        continue
-
-                    # AFIO rule: if NA COR, don't translate; later copy column C
-                    if afio_headers and _under_any_afio_header(cell.row, cell.column, afio_headers):
-                        if _norm(raw) == "NA COR":
-                            na_cor_targets.append((cell.row, cell.column))
-                            continue
-
-                    item_id = f"{ws.title}!{cell.coordinate}"
-                    items.append(TranslationItem(item_id, raw))
-                    coords.append((item_id, cell.row, cell.column))
-
-        batches = _chunk_list(items, batch_size)
+        na_cor_targets: List[Tuple[int, int]] = []  # (row, afio_col)
+        coords: List[Tuple[str, Cell]] = []
+
+        # One scan finds both the AFIO headers and the candidate strings; the
+        # AFIO rule needs all headers first, so it is applied to the candidates after
+        afio_found: List[Tuple[int, int]] = []
+        candidates: List[Tuple[int, int, str, Cell]] = []
+
+        # Only populated cells, row-major: work follows the data, not the size
+        # of the print ranges (sparse/inflated sheets)
+        for r, c in inside:
+            cell = cells[(r, c)]
+            # Strings only: numbers, dates, booleans, errors and formulas ("f")
+            # are rejected on the type code, before the value is looked at
+            if cell.data_type != "s":
+                continue
+
+            raw = cell.value
+            txt = raw.strip()
+            if not txt:
+                continue
+
+            # Skip formula-looking text
+            if txt.startswith("="):
+                continue
+
+            if txt[0] in "Aa" and _norm(raw) == "AFIO":
+                afio_found.append((r, c))
+            candidates.append((r, c, raw, cell))
+
+        afio_rows = _afio_first_row_by_col(_pick_afio_headers(afio_found))
+
+        for r, c, raw, cell in candidates:
+            # AFIO rule: if NA COR, don't translate; later copy column C
+            if r > afio_rows.get(c, r):
+                if _norm(raw) == "NA COR":
+                    na_cor_targets.append((r, c))
+                    continue
+
+            # Numbers, prices, codes, URLs stored as text: the model would
+            # return them unchanged
+            if not is_translatable(raw):
+                continue
+
+            item_id = str(next_id)
+            next_id += 1
+            items.append(TranslationItem(item_id, raw))
+            coords.append((item_id, cell))
+
+        plans.append((ws, coords, na_cor_targets, outside, bounds))
+
+    unique_items, alias = dedupe_items(items)
+    mapping: Dict[str, str] = {}
+
+    # A cell that is exactly one glossary term needs no model call: its EN term
+    # is what the glossary prescribes (and what the hard pass would force)
+    terms = glossary_terms(glossary)
+    if terms:
+        for it in unique_items:
+            en = terms.get(it.text.strip().lower())
+            if en is not None:
+                mapping[it.id] = en
+        unique_items = [it for it in unique_items if it.id not in mapping]
+
+    # Opt-in: strings seen in earlier files of this process, then the on-disk
+    # memory, both keyed by one digest of everything that changes the output
+    use_cache = translation_cache_enabled(use_translation_cache)
+    digest = ""
+    if use_cache:
+        digest = context_digest(
+            (
+                getattr(translator, "model", ""),
+                getattr(translator, "reasoning_effort", ""),
+                source_lang,
+                target_lang,
+                tuple(sorted(glossary.items())),
+                extra_instructions,
+            )
+        )
+    cached = MEMORY_CACHE.get_many(digest, (it.text for it in unique_items)) if use_cache else {}
+    tm: Optional[TranslationCache] = TranslationCache() if use_cache else None
+    try:
+        if tm is not None:
+            cached.update(tm.get_many(digest, (it.text for it in unique_items if it.text not in cached)))
+        for it in unique_items:
+            if it.text in cached:
+                mapping[it.id] = cached[it.text]
+        unique_items = [it for it in unique_items if it.text not in cached]
+
+        batches = _chunk_list(unique_items, batch_size)
         num_batches = max(1, len(batches))
         if on_progress:
             on_progress("batches", 0, num_batches)
 
-        mapping: Dict[str, str] = {}
-        for b_idx, batch in enumerate(batches, start=1):
-            if on_progress:
-                on_progress("batches", b_idx - 1, num_batches)
-
-            mapping.update(
-                translator.translate_batch(
-                    batch,
-                    source_lang=source_lang,
-                    target_lang=target_lang,
-                    glossary=glossary,
-                    extra_instructions=extra_instructions,
-                )
-            )
+        done = 0
 
+        def _batch_done(batch: List[TranslationItem]) -> None:
+            nonlocal done
+            done += 1
             if on_progress:
-                on_progress("batches", b_idx, num_batches)
-
-        # Write translations back
-        for item_id, r, c in coords:
-            new_text = mapping.get(item_id)
-            if isinstance(new_text, str):
-                ws.cell(row=r, column=c).value = apply_glossary_hard(new_text, glossary)
+                on_progress("batches", done, num_batches)
+
+        translated = translate_chunks(
+            translator,
+            batches,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            glossary=glossary,
+            extra_instructions=extra_instructions,
+            max_workers=max_workers,
+            on_chunk_done=_batch_done,
+            use_batch_api=use_batch_api,
+        )
+        mapping.update(translated)
+        # A reply equal to the source is also what a failed/missing item falls
+        # back to: don't cache those
+        fresh = [(it.text, translated[it.id]) for it in unique_items if translated.get(it.id, it.text) != it.text]
+        if use_cache:
+            MEMORY_CACHE.put_many(digest, fresh)
+        if tm is not None:
+            tm.put_many(digest, fresh)
+    finally:
+        # Also on a failed translation: don't leak the SQLite/WAL connection
+        if tm is not None:
+            tm.close()
+
+    # Hard glossary pass once per distinct translation, not once per cell
+    # that shares it
+    final = {uid: glossary_fix(text) for uid, text in mapping.items() if isinstance(text, str)}
+
+    # Pass 2: write back, then clear and crop each sheet
+    for ws, coords, na_cor_targets, outside, bounds in plans:
+        # Write translations back into the cells captured at collection time
+        for item_id, cell in coords:
+            new_text = final.get(alias[item_id])
+            if new_text is not None:
+                cell.value = new_text
 
         # AFIO NA COR -> copy column C (3) value AFTER translation
         for r, afio_col in na_cor_targets:
             src_val = ws.cell(row=r, column=3).value
             ws.cell(row=r, column=afio_col).value = "" if src_val is None else src_val
 
-        # Clear inside union but outside actual print blocks
-        for r in range(min_row, max_row + 1):
-            for c in range(min_col, max_col + 1):
-                if not _cell_in_ranges(r, c, ranges):
-                    cell = ws.cell(row=r, column=c)
-                    if cell.value is not None:
-                        cell.value = None
+        # Clear inside union but outside actual print blocks. Only cells that
+        # exist can hold a value: walk those instead of every coordinate of the
+        # union (work follows the populated cells, not the union area).
+        # Bare cells are dropped outright (less for the crop and the save to
+        # walk); cells with a style, comment or link keep their formatting
+        cells = ws._cells
+        for key in outside:
+            cell = cells[key]
+            if not cell.has_style and cell._comment is None and cell._hyperlink is None:
+                del cells[key]
+            elif cell.value is not None:
+                cell.value = None
 
         # Delete everything outside print area union and reset print area
-        _crop_sheet_to_union(ws, min_row, max_row, min_col, max_col)
+        _crop_sheet_to_union(ws, *bounds)
+
+    return wb
 
+
+def _save_uncompressed(wb: openpyxl.Workbook, path: Path) -> None:
+    """
+    wb.save() without deflate (ZIP_STORED): for intermediates LibreOffice reads
+    once and re-encodes anyway, compressing them is wasted time.
+    """
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+        ExcelWriter(wb, archive).write_data()
+
+
+def translate_workbook_bytes_openpyxl(
+    workbook_bytes: bytes,
+    translator: OpenAITranslator,
+    source_lang: str,
+    target_lang: str,
+    glossary: Dict[str, str],
+    extra_instructions: str,
+    on_progress: Optional[Callable[[str, int, int], None]],
+    batch_size: int,
+    max_workers: int = 8,
+    use_translation_cache: Optional[bool] = None,
+    use_batch_api: Optional[bool] = None,
+    output: Optional[BinaryIO] = None,
+) -> bytes:
+    """
+    Translate xlsx/xlsm bytes using openpyxl (see _translate_workbook); returns the saved bytes.
+    If output (a writable binary file/stream) is given, the workbook is saved straight
+    into it and b"" is returned, avoiding the in-memory copy.
+    """
+    wb = _translate_workbook(
+        workbook_bytes,
+        translator,
+        source_lang,
+        target_lang,
+        glossary,
+        extra_instructions,
+        on_progress,
+        batch_size,
+        max_workers=max_workers,
+        use_translation_cache=use_translation_cache,
+        use_batch_api=use_batch_api,
+    )
+    if output is not None:
+        wb.save(output)
+        return b""
     out = io.BytesIO()
     wb.save(out)
     return out.getvalue()
@@ -256,7 +475,10 @@ def translate_excel_to_xls_bytes(
     glossary: Optional[Dict[str, str]] = None,
     extra_instructions: str = "",
     on_progress: Optional[Callable[[str, int, int], None]] = None,
-    batch_size: int = 25,
+    batch_size: int = 100,
+    max_workers: int = 8,
+    use_translation_cache: Optional[bool] = None,
+    use_batch_api: Optional[bool] = None,
 ) -> bytes:
     """
     Accept .xlsm or .xls input and ALWAYS return .xls output.
@@ -276,7 +498,7 @@ def translate_excel_to_xls_bytes(
         working_bytes = convert_office_bytes(excel_bytes, "xls", "xlsx")
         working_ext_for_soffice = "xlsx"
 
-    translated_openpyxl_bytes = translate_workbook_bytes_openpyxl(
+    wb = _translate_workbook(
         workbook_bytes=working_bytes,
         translator=translator,
         source_lang=source_lang,
@@ -285,8 +507,16 @@ def translate_excel_to_xls_bytes(
         extra_instructions=extra_instructions,
         on_progress=on_progress,
         batch_size=batch_size,
+        max_workers=max_workers,
+        use_translation_cache=use_translation_cache,
+        use_batch_api=use_batch_api,
     )
 
     # Convert translated workbook -> xls
     # (macros are not guaranteed to survive .xls output; that's expected)
-    return convert_office_bytes(translated_openpyxl_bytes, working_ext_for_soffice, "xls")
+    # Saved straight into LibreOffice's working dir: no in-memory copy of the
+    # intermediate workbook, and no compression
+    with tempfile.TemporaryDirectory() as td:
+        in_path = Path(td) / f"input.{working_ext_for_soffice}"
+        _save_uncompressed(wb, in_path)
+        return convert_office_file(in_path, "xls")
@@ -0,0 +1,49 @@
+import unittest
+
+import fitz  # PyMuPDF
+
+from src.call_utils import translate_file
+
+
+class _UpperTranslator:
+    """Stand-in for OpenAITranslator: 'translates' by upper-casing."""
+
+    def translate_batch(self, items, source_lang="pt-BR", target_lang="en", glossary=None, extra_instructions=""):
+        return {it.id: it.text.upper() for it in items}
+
+
+def _pdf_bytes() -> bytes:
+    doc = fitz.open()
+    for text in ("Forro em couro", "Alça de mão"):
+        page = doc.new_page()
+        page.insert_text((72, 72), text, fontsize=12)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class TranslateFileProgressTest(unittest.TestCase):
+    def test_pdf_progress_reaches_callback(self):
+        events = []
+
+        def on_progress(label, done, total):
+            events.append((label, done, total))
+
+        out_name, out_bytes, mime = translate_file(
+            "techpack.pdf", _pdf_bytes(), _UpperTranslator(), on_progress, glossary={}, extra_instructions=""
+        )
+
+        self.assertEqual(out_name, "techpack_EN.pdf")
+        self.assertEqual(mime, "application/pdf")
+        self.assertTrue(out_bytes.startswith(b"%PDF"))
+        # (label, fraction) from the PDF path arrives as (label, done, total)
+        self.assertTrue(events)
+        for label, done, total in events:
+            self.assertIsInstance(label, str)
+            self.assertEqual(total, 100)
+            self.assertTrue(0 <= done <= 100)
+        self.assertEqual(events[-1][1:], (100, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()